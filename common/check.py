@@ -1,38 +1,66 @@
 import asyncio
 import time
-from typing import Dict, Any, Optional
-import ujson as json
+from typing import Dict, Optional, Tuple
+import simdjson
 from aiohttp import ClientError, ClientSession
+from .jsonlib import loads, JSONDecodeError
 from .log import log
+from .session import resolve_session
 from .stack_error import stack_error
 
 GITHUB_API_RATE_LIMIT_URL = 'https://api.github.com/rate_limit'
-CACHE_EXPIRE_TIME = 60  # 缓存过期时间60秒
+CACHE_EXPIRE_TIME = 60  # 缓存基础过期时间60秒
+
+# 模块级解析器，复用内部缓冲区实现零分配重解析
+_parser = simdjson.Parser()
 
 class RateLimitCache:
-    """GitHub API请求限制缓存"""
+    """GitHub API请求限制缓存，有效期跟随GitHub返回的限额信号"""
     def __init__(self):
-        self._cache = None
-        self._last_update = 0.0
+        self._cache: Optional[Tuple[int, int]] = None
+        self._valid_until = 0.0
 
     @property
     def is_expired(self) -> bool:
-        return time.monotonic() - self._last_update > CACHE_EXPIRE_TIME
+        return time.time() >= self._valid_until
 
-    def get(self) -> Optional[Dict[str, Any]]:
+    def get(self) -> Optional[Tuple[int, int]]:
         return self._cache if not self.is_expired else None
 
-    def set(self, data: Dict[str, Any]) -> None:
-        self._cache = data
-        self._last_update = time.monotonic()
+    def set(self, remaining: int, reset_ts: int) -> None:
+        self._cache = (remaining, reset_ts)
+        # 限额越紧张缓存越久（耗尽时直接缓存到重置点，避免撞429），
+        # 但不低于基础TTL、不超过GitHub自己宣告的重置时间
+        dynamic_ttl = max(float(CACHE_EXPIRE_TIME), 3600.0 / max(remaining, 1))
+        self._valid_until = min(float(reset_ts), time.time() + dynamic_ttl)
+
+    def note_observed(self, headers) -> None:
+        """从任意GitHub响应头吸收限额信息，作为来自源头的失效信号"""
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_ts = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset_ts is None:
+            return
+        try:
+            self.set(int(remaining), int(reset_ts))
+        except ValueError:
+            pass
 
 rate_limit_cache = RateLimitCache()
 
-def _process_rate_limit(data: Dict[str, Any]) -> None:
+def _extract_rate_limit(raw: bytes) -> Tuple[int, int]:
+    """用simdjson惰性解析限额字段，不物化整个响应dict"""
+    doc = _parser.parse(raw)
+    try:
+        remaining = doc.at_pointer('/resources/core/remaining')
+        reset_ts = doc.at_pointer('/resources/core/reset')
+    except KeyError:
+        remaining = doc.at_pointer('/rate/remaining')
+        reset_ts = doc.at_pointer('/rate/reset')
+    # simdjson对象在下次parse时失效，立即取出标量值
+    return int(remaining), int(reset_ts)
+
+def _process_rate_limit(remaining: int, reset_ts: int) -> None:
     """处理GitHub API请求限制数据"""
-    rate = data.get('resources', {}).get('core', data.get('rate', {}))
-    remaining = rate.get('remaining', 0)
-    reset_ts = rate.get('reset', int(time.time()))
     reset_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(reset_ts))
 
     log.info(f'[GitHub API] 剩余请求次数: {remaining}')
@@ -45,14 +73,18 @@ def _process_rate_limit(data: Dict[str, Any]) -> None:
 
 async def check_github_api_rate_limit(
     headers: Dict[str, str],
-    session: ClientSession,
+    session: Optional[ClientSession] = None,
     max_retries: int = 3
 ) -> None:
-    """检查GitHub API请求限制，带智能重试机制"""
+    """检查GitHub API请求限制，带智能重试机制
+
+    session缺省时使用上下文绑定的共享会话。
+    """
+    session = resolve_session(session)
     try:
         if (cached := rate_limit_cache.get()):
             log.debug('[GitHub API] 使用缓存数据')
-            _process_rate_limit(cached)
+            _process_rate_limit(*cached)
             return
 
         for attempt in range(max_retries):
@@ -65,13 +97,16 @@ async def check_github_api_rate_limit(
 
                     # 处理成功响应
                     try:
-                        data = await resp.json(loads=json.loads)
-                    except json.JSONDecodeError:
-                        log.warning('响应数据非JSON格式，尝试文本解析')
-                        data = await _parse_fallback_response(resp)
-
-                    rate_limit_cache.set(data)
-                    _process_rate_limit(data)
+                        remaining, reset_ts = _extract_rate_limit(await resp.read())
+                        rate_limit_cache.set(remaining, reset_ts)
+                    except (ValueError, KeyError):
+                        log.warning('响应数据非JSON格式，改用响应头信号')
+                        rate_limit_cache.note_observed(resp.headers)
+                        if (cached := rate_limit_cache.get()) is None:
+                            continue
+                        remaining, reset_ts = cached
+
+                    _process_rate_limit(remaining, reset_ts)
                     return
 
             except (ClientError, asyncio.TimeoutError) as e:
@@ -89,9 +124,9 @@ async def _handle_non_200_response(resp, attempt: int, max_retries: int) -> None
     error_msg = f"[GitHub API] 异常状态码: {resp.status}"
     
     try:
-        error_data = await resp.json(loads=json.loads)
+        error_data = loads(await resp.read())
         error_msg += f", 信息: {error_data.get('message', '未知错误')}"
-    except json.JSONDecodeError:
+    except JSONDecodeError:
         error_msg += ", 响应内容非JSON格式"
 
     log.error(error_msg)
@@ -110,14 +145,6 @@ async def _handle_non_200_response(resp, attempt: int, max_retries: int) -> None
             log.info(f"⏳ 第 {attempt+1}/{max_retries} 次重试，等待 {wait}s...")
             await asyncio.sleep(wait)
 
-async def _parse_fallback_response(resp) -> Dict:
-    """备用的响应解析方法"""
-    text = await resp.text()
-    return {'rate': {
-        'remaining': int(resp.headers.get('X-RateLimit-Remaining', 0)),
-        'reset': int(resp.headers.get('X-RateLimit-Reset', time.time()))
-    }}
-
 async def _handle_retryable_error(e: Exception, attempt: int, max_retries: int) -> None:
     """处理可重试的错误"""
     log.warning(f'⚠️ 网络错误: {stack_error(e)}')
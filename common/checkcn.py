@@ -1,41 +1,51 @@
 import os
+import asyncio
+from typing import Optional
+
 import aiohttp
-import ujson as json
+import simdjson
 from .log import log
+from .session import resolve_session
 from .stack_error import stack_error
 
+# 模块级解析器，复用内部缓冲区
+_parser = simdjson.Parser()
+
 def set_cn_environment(is_cn: bool) -> None:
     """设置中国区环境标识"""
     os.environ['IS_CN'] = 'yes' if is_cn else 'no'
 
-async def checkcn(client: aiohttp.ClientSession, timeout: int = 10, retries: int = 3) -> bool:
+async def checkcn(client: Optional[aiohttp.ClientSession] = None, timeout: int = 10, retries: int = 3) -> bool:
     """智能检测用户网络区域
-     
+
     Args:
-        client: aiohttp 客户端会话
+        client: aiohttp 客户端会话，缺省时使用上下文绑定的共享会话
         timeout: 单次请求超时时间（秒）
         retries: 最大重试次数
-        
+
     Returns:
         bool: 是否需要使用中国大陆CDN
     """
+    client = resolve_session(client)
     url = 'https://mips.kugou.com/check/iscn?&format=json'
     
     for attempt in range(1, retries+1):
         try:
             async with client.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                # 响应只有几十字节，recursive=True直接物化为dict，
+                # 立即释放解析器缓冲区——否则异常路径上残留的代理对象
+                # 会让下一次重试的parse()抛RuntimeError
                 try:
-                    body = json.loads(await response.read())
-                except json.JSONDecodeError:
+                    data = _parser.parse(await response.read(), True)
+                except ValueError:
                     raise ValueError("Invalid JSON response")
 
-                # 处理响应数据缺失关键字段的情况
-                if 'flag' not in body:
+                try:
+                    is_in_china = bool(data['flag'])
+                except KeyError:
                     raise KeyError("Missing 'flag' field in response")
-                
-                # 解析网络区域标识
-                is_in_china = bool(body['flag'])
-                country = body.get('country', '未知地区')
+
+                country = data.get('country', '未知地区')
 
                 # 根据结果设置环境并记录日志
                 log_msg, cn_flag = (
@@ -51,8 +61,8 @@ async def checkcn(client: aiohttp.ClientSession, timeout: int = 10, retries: int
             log.info("🛑 用户主动中断检测流程")
             return False
             
-        except (aiohttp.ClientTimeout, aiohttp.ClientError) as e:
-            error_type = "请求超时" if isinstance(e, aiohttp.ClientTimeout) else "网络连接异常"
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            error_type = "请求超时" if isinstance(e, asyncio.TimeoutError) else "网络连接异常"
             log.warning(f"⏳ {error_type}（{stack_error(e)}），正在进行第 {attempt}/{retries} 次重试...")
             if attempt == retries:
                 log.warning("⚠️ 达到最大重试次数，默认启用中国大陆模式")
@@ -2,7 +2,7 @@ import os
 import sys
 from pathlib import Path
 from typing import Dict, Any, Optional
-import ujson as json
+from .jsonlib import dumps, loads
 from .stack_error import stack_error
 from .log import log
 
@@ -21,14 +21,9 @@ class ConfigManager:
         """生成默认配置文件"""
         try:
             self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(
-                    DEFAULT_CONFIG,
-                    f,
-                    indent=2,
-                    ensure_ascii=False,
-                    escape_forward_slashes=False
-                )
+            # dumps直接输出UTF-8字节，免去str编码一步
+            with open(self.config_path, "wb") as f:
+                f.write(dumps(DEFAULT_CONFIG, indent=True))
             log.info('📄 配置文件已生成，请填写后重新启动程序')
         except (OSError, TypeError, ValueError) as e:
             log.error(f'❌ 配置文件生成失败: {stack_error(e)}')
@@ -46,9 +41,11 @@ class ConfigManager:
             sys.exit(1)
 
         try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (OSError, ValueError) as e:
+            with open(self.config_path, "rb") as f:
+                loaded = loads(f.read())
+            self._notify_reload()
+            return loaded
+        except (OSError, ValueError) as e:  # JSONDecodeError是ValueError的子类
             log.error(f"❌ 配置文件加载失败: {stack_error(e)}")
             try:
                 self.config_path.unlink(missing_ok=True)
@@ -62,9 +59,22 @@ class ConfigManager:
             log.info("🛑 程序已退出")
             sys.exit(0)
 
+    @staticmethod
+    def _notify_reload() -> None:
+        """配置重载后使依赖配置的缓存失效"""
+        try:
+            from .get_steam_path import invalidate_steam_path
+        except ImportError:
+            # 首次加载时get_steam_path尚未完成导入
+            return
+        invalidate_steam_path()
+
 # 单例配置管理器实例
 config_manager = ConfigManager()
 
 def get_config() -> Dict[str, Any]:
     """同步获取配置"""
-    return config_manager.load_config()
\ No newline at end of file
+    return config_manager.load_config()
+
+# 模块级配置快照，供各模块直接导入
+config: Dict[str, Any] = get_config()
\ No newline at end of file
@@ -1,5 +1,4 @@
 import asyncio
-import aiofiles
 import vdf
 import os
 from pathlib import Path
@@ -8,27 +7,41 @@ from .log import log
 
 lock = asyncio.Lock()
 
+# 按文件mtime缓存解析结果，连续合并时跳过重复的VDF解析
+_parse_cache: Dict[Path, tuple] = {}
+
 
 async def _read_config(config_path: Path) -> Dict[str, Any]:
-    async with aiofiles.open(config_path, encoding='utf-8') as f:
-        content = await f.read()
-    return vdf.loads(content)
+    mtime = (await asyncio.to_thread(config_path.stat)).st_mtime
+    cached = _parse_cache.get(config_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    # 配置文件很小，一次read_text只需一趟线程池往返
+    content = await asyncio.to_thread(config_path.read_text, encoding='utf-8')
+    config = vdf.loads(content)
+    _parse_cache[config_path] = (mtime, config)
+    return config
 
 
-async def _write_config(config_path: Path, config: Dict[str, Any]) -> None:
+def _sync_write_config(config_path: Path, config: Dict[str, Any]) -> None:
+    """写临时文件、fsync后原子替换，整个过程在一个线程内完成"""
     temp_path = config_path.with_name(config_path.name + '.tmp')
     try:
-        async with aiofiles.open(temp_path, mode='w', encoding='utf-8') as f:
-            new_context = vdf.dumps(config, pretty=True)
-            await f.write(new_context)
-        # 替换原文件
-        await asyncio.to_thread(os.replace, temp_path, config_path)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(vdf.dumps(config, pretty=True))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, config_path)
     except Exception:
-        if await asyncio.to_thread(temp_path.exists):
-            await asyncio.to_thread(temp_path.unlink)
+        if temp_path.exists():
+            temp_path.unlink()
         raise
 
 
+async def _write_config(config_path: Path, config: Dict[str, Any]) -> None:
+    await asyncio.to_thread(_sync_write_config, config_path, config)
+
+
 def _get_steam_config(config: Dict[str, Any]) -> Dict[str, Any]:
     software = config.get('InstallConfigStore', {}).get('Software', {})
     return next(
@@ -61,9 +74,23 @@ async def depotkey_merge(config_path: Path, depots_config: Dict[str, Any]) -> bo
                 return False
 
             depots = steam.setdefault('depots', {})
-            depots.update(depots_config.get('depots', {}))
-            
+
+            # 只挑出真正有变化的键；全量重写整份VDF是合并里最贵的一步
+            incoming = depots_config.get('depots', {})
+            delta = {k: v for k, v in incoming.items() if depots.get(k) != v}
+            if not delta:
+                log.info('✅ 无变更，跳过写入')
+                return True
+
+            # 就地修改前先令缓存失效：若写盘失败，缓存不能以旧mtime
+            # 继续持有已合并的dict，否则重试会误判"无变更"而丢数据
+            _parse_cache.pop(config_path, None)
+            depots.update(delta)
+
             await _write_config(config_path, config)
+            # 写盘成功后以新mtime重新入缓存，后续合并继续跳过解析
+            new_mtime = (await asyncio.to_thread(config_path.stat)).st_mtime
+            _parse_cache[config_path] = (new_mtime, config)
             log.info('✅ 成功合并')
             return True
 
@@ -2,11 +2,14 @@ import os
 import time
 import hashlib
 import asyncio
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional, List
 from aiohttp import ClientError, ClientSession
+from blake3 import blake3
 from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn, DownloadColumn
-import aiofiles
 from .log import log
+from .session import resolve_session
 
 class NotFoundError(Exception):
     """当资源不存在时抛出异常"""
@@ -21,80 +24,302 @@ class HttpError(Exception):
         self.status_code = status_code
         self.url = url
 
+def _sync_read(path: str) -> bytes:
+    """单次syscall读取整个文件，供线程池调用"""
+    with open(path, 'rb', buffering=0) as f:
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass  # Windows无posix_fadvise
+        return f.read()
+
+def _sync_write(path: str, content: bytes) -> None:
+    """先写临时文件再os.replace原子落盘，供线程池调用"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+def _sync_verify_copy(src: str, dest, sha_hex: str) -> bool:
+    """读blob、校验sha256、写入dest，同一趟线程内完成
+
+    Returns:
+        bool: 校验是否通过；不通过时不写dest
+    """
+    content = _sync_read(src)
+    if hashlib.sha256(content).hexdigest() != sha_hex:
+        return False
+    with open(dest, 'wb') as f:
+        f.write(content)
+    return True
+
+# 磁盘缓存目录，blob按内容寻址存放在其下的blobs/
+CACHE_DIR = './cache'
+
+# CN镜像与默认源的URL模板
+CN_URL_TEMPLATES = (
+    'https://jsdelivr.pai233.top/gh/{repo}@{sha}/{path}',
+    'https://cdn.jsdmirror.com/gh/{repo}@{sha}/{path}',
+    'https://raw.gitmirror.com/{repo}/{sha}/{path}',
+    'https://raw.dgithub.xyz/{repo}/{sha}/{path}',
+    'https://gh.akass.cn/{repo}/{sha}/{path}',
+)
+DEFAULT_URL_TEMPLATE = 'https://raw.githubusercontent.com/{repo}/{sha}/{path}'
+
+@lru_cache(maxsize=32)
+def _cn_url_prefixes(repo: str, sha: str) -> tuple:
+    """(repo, sha)在一次批量下载中不变，预先代入后每个path只剩一次替换"""
+    return tuple(
+        t.replace('{repo}', repo).replace('{sha}', sha) for t in CN_URL_TEMPLATES
+    )
+
+@lru_cache(maxsize=256)
+def _hash_key(cache_key: str) -> str:
+    """缓存键哈希；同一键在读/写路径各算一次，lru_cache直接复用"""
+    # 16字节输出与md5同长，保持文件名格式不变
+    return blake3(cache_key.encode()).hexdigest(length=16)
+
+def _default_progress() -> Progress:
+    """构建默认进度条渲染器"""
+    return Progress(
+        TextColumn("[progress.description]{task.description}", style="#66CCFF"),
+        BarColumn(style="#66CCFF", complete_style="#4CE49F", finished_style="#2FE9D9"),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%", style="#66CCFF"),
+        TimeElapsedColumn(),
+        DownloadColumn(),
+        transient=True,
+        refresh_per_second=10,
+    )
+
 class Downloader:
     @staticmethod
     def get_cn_urls(repo: str, sha: str, path: str) -> List[str]:
-        return [
-            f'https://jsdelivr.pai233.top/gh/{repo}@{sha}/{path}',
-            f'https://cdn.jsdmirror.com/gh/{repo}@{sha}/{path}',
-            f'https://raw.gitmirror.com/{repo}/{sha}/{path}',
-            f'https://raw.dgithub.xyz/{repo}/{sha}/{path}',
-            f'https://gh.akass.cn/{repo}/{sha}/{path}'
-        ]
+        return [t.replace('{path}', path) for t in _cn_url_prefixes(repo, sha)]
 
     @staticmethod
     def get_default_url(repo: str, sha: str, path: str) -> str:
-        return f'https://raw.githubusercontent.com/{repo}/{sha}/{path}'
+        return DEFAULT_URL_TEMPLATE.format(repo=repo, sha=sha, path=path)
+
+    # 内存缓存条目上限，超出后按LRU淘汰
+    MEMORY_CACHE_MAX_ENTRIES = 64
+
+    # 对冲延迟：镜像N+1比镜像N晚0.2s发出，首个镜像够快时不浪费带宽
+    HEDGE_DELAY = 0.2
 
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(self, cache_dir: Optional[str] = None, progress: Optional[Progress] = None):
         self.cache_dir = cache_dir
-        self.memory_cache = {}
+        self.memory_cache: OrderedDict = OrderedDict()
+        self._progress = progress
+        self._owns_progress = False
         if cache_dir:
-            os.makedirs(cache_dir, exist_ok=True)
+            os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+
+    def set_progress(self, progress: Progress) -> None:
+        """注入外部共享的进度条渲染器"""
+        self._progress = progress
+        self._owns_progress = False
+
+    def _ensure_progress(self) -> Progress:
+        """惰性创建并启动进度条，多个并发下载共享同一渲染器"""
+        if self._progress is None:
+            self._progress = _default_progress()
+            self._progress.start()
+            self._owns_progress = True
+        return self._progress
+
+    def stop_progress(self) -> None:
+        """停止自有的进度条渲染器"""
+        if self._owns_progress and self._progress is not None:
+            self._progress.stop()
+            self._progress = None
+            self._owns_progress = False
 
     def _get_cache_path(self, cache_key: str) -> str:
-        """生成安全的缓存文件路径"""
-        filename = hashlib.md5(cache_key.encode()).hexdigest()
-        return os.path.join(self.cache_dir, filename) if self.cache_dir else ""
+        """生成安全的缓存索引文件路径，索引内容为指向blob的sha256"""
+        return os.path.join(self.cache_dir, _hash_key(cache_key)) if self.cache_dir else ""
+
+    def _get_blob_path(self, sha_hex: str) -> str:
+        """按内容sha256寻址的blob存储路径，相同内容只存一份"""
+        return os.path.join(self.cache_dir, 'blobs', sha_hex[:2], sha_hex)
+
+    def _memory_cache_put(self, cache_key: str, content: bytes) -> None:
+        """写入内存缓存并按LRU淘汰最久未用的条目"""
+        self.memory_cache[cache_key] = content
+        self.memory_cache.move_to_end(cache_key)
+        while len(self.memory_cache) > self.MEMORY_CACHE_MAX_ENTRIES:
+            self.memory_cache.popitem(last=False)
 
-    async def _try_read_cache(self, cache_key: str) -> Optional[bytearray]:
-        """尝试从缓存读取内容"""
+    async def _try_read_cache(self, cache_key: str) -> Optional[bytes]:
+        """尝试从缓存读取内容，读取时校验内容sha256"""
         # 检查内存缓存
         if cache_key in self.memory_cache:
+            self.memory_cache.move_to_end(cache_key)
             return self.memory_cache[cache_key]
 
-        # 检查磁盘缓存
+        # 检查磁盘缓存：索引文件 -> sha256 -> blob
+        # 整个文件一次读入，避免aiofiles按块经线程池搬运
         if self.cache_dir:
             cache_path = self._get_cache_path(cache_key)
             try:
-                async with aiofiles.open(cache_path, 'rb') as f:
-                    content = bytearray(await f.read())
-                    self.memory_cache[cache_key] = content
-                    return content
+                sha_hex = (await asyncio.to_thread(_sync_read, cache_path)).decode().strip()
+                content = await asyncio.to_thread(_sync_read, self._get_blob_path(sha_hex))
+                # SHA-NI硬件加速下校验几乎免费，防止损坏缓存混入Steam
+                if hashlib.sha256(content).hexdigest() != sha_hex:
+                    log.warning(f"⚠️ 缓存校验失败，忽略损坏条目: {cache_key}")
+                    return None
+                self._memory_cache_put(cache_key, content)
+                return content
             except FileNotFoundError:
                 pass
             except Exception as e:
                 log.error(f"缓存读取失败: {str(e)}")
         return None
 
-    async def _write_cache(self, cache_key: str, content: bytearray):
-        """写入缓存"""
-        self.memory_cache[cache_key] = content
+    async def _write_cache(self, cache_key: str, content: bytes):
+        """写入缓存：blob按内容寻址去重，索引指向blob"""
+        self._memory_cache_put(cache_key, content)
         if self.cache_dir:
-            cache_path = self._get_cache_path(cache_key)
+            sha_hex = hashlib.sha256(content).hexdigest()
+            blob_path = self._get_blob_path(sha_hex)
             try:
-                async with aiofiles.open(cache_path, 'wb') as f:
-                    await f.write(content)
+                if not os.path.exists(blob_path):
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    await asyncio.to_thread(_sync_write, blob_path, content)
+                await asyncio.to_thread(
+                    _sync_write, self._get_cache_path(cache_key), sha_hex.encode()
+                )
             except Exception as e:
                 log.error(f"缓存写入失败: {str(e)}")
 
-    async def _download_url(self, url: str, session: ClientSession, path: str, 
-                           chunk_size: int, progress: Progress, task: int) -> bytearray:
-        """从单个URL下载内容"""
-        async with session.get(url, ssl=False, timeout=30) as response:
+    async def stream_to(self, cache_key: str, dest) -> bool:
+        """磁盘缓存命中时把blob复制到dest，复制前校验内容sha256
+
+        这是字节真正进入Steam的路径，与_try_read_cache一样不信任
+        磁盘缓存：读、校验、写在同一趟线程池往返内完成，
+        校验失败时不落dest，调用方回退到完整下载。
+
+        Returns:
+            bool: 是否命中磁盘缓存、校验通过并完成复制
+        """
+        if not self.cache_dir:
+            return False
+        cache_path = self._get_cache_path(cache_key)
+        try:
+            sha_hex = (await asyncio.to_thread(_sync_read, cache_path)).decode().strip()
+            if await asyncio.to_thread(
+                _sync_verify_copy, self._get_blob_path(sha_hex), dest, sha_hex
+            ):
+                return True
+            log.warning(f"⚠️ 缓存校验失败，忽略损坏条目: {cache_key}")
+            return False
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            log.error(f"缓存复制失败: {str(e)}")
+            return False
+
+    # 竞速失败后值得换镜像重试的异常类型，其余异常视为bug直接上抛
+    RETRYABLE_EXCEPTIONS = (ClientError, HttpError, asyncio.TimeoutError)
+
+    async def _download_url(self, url: str, session: ClientSession, path: str,
+                           chunk_size: int, progress: Progress) -> bytes:
+        """从单个URL下载内容，进度在各自的task上汇报"""
+        # 超时交由共享会话的默认ClientTimeout控制
+        async with session.get(url, ssl=False) as response:
             if response.status == 200:
-                content = bytearray()
-                async for chunk in response.content.iter_chunked(chunk_size):
-                    content.extend(chunk)
-                    progress.update(task, advance=len(chunk))
-                return content
-            
+                total = int(response.headers.get('Content-Length', 0))
+                # 每个竞速请求各占一个task，避免多镜像写同一进度条互相踩踏
+                task = progress.add_task(
+                    f"📥 下载 {path} 中...", total=total if total > 0 else None
+                )
+                try:
+                    if total > 0:
+                        # 已知长度时预分配缓冲区，memoryview拷贝避免增长重分配
+                        buf = bytearray(total)
+                        mv = memoryview(buf)
+                        offset = 0
+                        async for chunk in response.content.iter_chunked(chunk_size):
+                            mv[offset:offset + len(chunk)] = chunk
+                            offset += len(chunk)
+                            progress.update(task, advance=len(chunk))
+                        return bytes(mv[:offset])
+                    # 未知长度时收集chunk列表，join一次性预定尺寸拼接，
+                    # 避免bytearray.extend的摊销重分配
+                    chunks: List[bytes] = []
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        chunks.append(chunk)
+                        progress.update(task, advance=len(chunk))
+                    return b''.join(chunks)
+                finally:
+                    progress.remove_task(task)
+
             if response.status == 404:
                 raise NotFoundError(url)
             raise HttpError(response.status, url)
 
-    async def get(self, sha: str, path: str, repo: str, session: ClientSession,
-                 chunk_size: int = 1024, timeout: int = 30) -> bytearray:
+    async def _hedged_fetch(self, url: str, delay: float, session: ClientSession,
+                           path: str, chunk_size: int, progress: Progress) -> bytes:
+        """延迟delay秒后发起下载，用于镜像间的对冲请求"""
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await self._download_url(url, session, path, chunk_size, progress)
+
+    async def _race_urls(self, urls: List[str], session: ClientSession, path: str,
+                        chunk_size: int, progress: Progress):
+        """并发竞速多个镜像，取首个成功结果并取消其余任务
+
+        Returns:
+            (content, not_found_urls, errors): content为None表示本轮全部失败
+        """
+        tasks = {
+            asyncio.create_task(
+                self._hedged_fetch(url, i * self.HEDGE_DELAY, session, path,
+                                   chunk_size, progress)
+            ): url
+            for i, url in enumerate(urls)
+        }
+
+        content: Optional[bytes] = None
+        not_found: List[str] = []
+        errors: List[str] = []
+        fatal_exc: Optional[BaseException] = None
+        pending = set(tasks)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                url = tasks[t]
+                exc = t.exception()
+                if exc is None:
+                    if content is None:
+                        content = t.result()
+                elif isinstance(exc, NotFoundError):
+                    log.warning(f"⚠️ 资源不存在: {exc.url}")
+                    not_found.append(url)
+                elif isinstance(exc, self.RETRYABLE_EXCEPTIONS):
+                    error_msg = f"{type(exc).__name__}: {str(exc)}"
+                    errors.append(f"URL {url}: {error_msg}")
+                    log.error(f"❌ 下载失败: {path} @ {url} - {error_msg}")
+                elif fatal_exc is None:
+                    # 非网络类异常说明出了真问题，不重试，收尾后原样上抛
+                    fatal_exc = exc
+
+            if content is not None or fatal_exc is not None:
+                # 胜出或出现致命异常，取消尚未完成的镜像请求
+                for t in pending:
+                    t.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                # 有镜像成功时以结果为准，否则把致命异常原样上抛
+                if content is None and fatal_exc is not None:
+                    raise fatal_exc
+                break
+
+        return content, not_found, errors
+
+    async def get(self, sha: str, path: str, repo: str,
+                 session: Optional[ClientSession] = None,
+                 chunk_size: int = 1024, timeout: int = 30) -> bytes:
+        session = resolve_session(session)
         cache_key = f"{repo}@{sha}/{path}"
         
         # 尝试读取缓存
@@ -109,53 +334,49 @@ class Downloader:
             else [self.get_default_url(repo, sha, path)]
         )
 
-        # 初始化进度条
-        with Progress(
-            TextColumn("[progress.description]{task.description}", style="#66CCFF"),
-            BarColumn(style="#66CCFF", complete_style="#4CE49F", finished_style="#2FE9D9"),
-            TextColumn("[progress.percentage]{task.percentage:>3.0f}%", style="#66CCFF"),
-            TimeElapsedColumn(),
-            DownloadColumn(),
-        ) as progress:
-            task_id = progress.add_task(f"📥 下载 {path} 中...", total=0)
-
-            retry_count = 3
-            errors = []
-            remaining_urls = url_list.copy()
-
-            while retry_count > 0 and remaining_urls:
-                current_errors = []
-                for url in list(remaining_urls):
-                    try:
-                        # 更新进度条描述为当前尝试的URL
-                        progress.update(task_id, description=f"📥 尝试 {url}")
-
-                        # 获取内容并更新进度条
-                        content = await self._download_url(
-                            url, session, path, chunk_size, progress, task_id
-                        )
-                        
-                        # 写入缓存并返回内容
-                        await self._write_cache(cache_key, content)
-                        return content
-
-                    except NotFoundError as e:
-                        log.warning(f"⚠️ 资源不存在: {e.url}")
-                        remaining_urls.remove(url)
-                    except (ClientError, HttpError, asyncio.TimeoutError) as e:
-                        error_msg = f"{type(e).__name__}: {str(e)}"
-                        current_errors.append(f"URL {url}: {error_msg}")
-                        log.error(f"❌ 下载失败: {path} @ {url} - {error_msg}")
-
-                # 记录本轮错误并准备重试
-                if current_errors:
-                    errors.extend(current_errors)
-                    retry_count -= 1
-                    if retry_count > 0 and remaining_urls:
-                        log.warning(f"⚠️ 剩余重试次数: {retry_count} - {path}")
-                        await asyncio.sleep(1)  # 重试间隔
+        # 复用共享进度条，避免每个文件各起一个渲染线程；
+        # 进度task由每个竞速请求自行创建/移除
+        progress = self._ensure_progress()
+
+        retry_count = 3
+        errors = []
+        remaining_urls = url_list.copy()
+
+        while retry_count > 0 and remaining_urls:
+            # 镜像间对冲竞速：慢镜像不再阻塞快镜像
+            content, not_found, current_errors = await self._race_urls(
+                remaining_urls, session, path, chunk_size, progress
+            )
+
+            if content is not None:
+                # 写入缓存并返回内容
+                await self._write_cache(cache_key, content)
+                return content
+
+            # 404的镜像从候选中剔除
+            for url in not_found:
+                remaining_urls.remove(url)
+
+            # 记录本轮错误并准备重试
+            if current_errors:
+                errors.extend(current_errors)
+                retry_count -= 1
+                if retry_count > 0 and remaining_urls:
+                    log.warning(f"⚠️ 剩余重试次数: {retry_count} - {path}")
+                    await asyncio.sleep(1)  # 重试间隔
 
         # 所有尝试失败后抛出异常
         error_log = "\n".join(errors)
         log.error(f"❌ 无法下载 {path}，所有尝试失败:\n{error_log}")
-        raise Exception(f"无法下载 {path}，详细错误:\n{error_log}")
\ No newline at end of file
+        raise Exception(f"无法下载 {path}，详细错误:\n{error_log}")
+
+
+# 进程内共享的下载器实例：内存LRU跨查询存活，磁盘缓存跨进程存活
+_shared_downloader: Optional[Downloader] = None
+
+def get_downloader() -> Downloader:
+    """获取共享的下载器实例，首次调用时创建并挂上持久化磁盘缓存"""
+    global _shared_downloader
+    if _shared_downloader is None:
+        _shared_downloader = Downloader(cache_dir=CACHE_DIR)
+    return _shared_downloader
\ No newline at end of file
@@ -1,23 +1,32 @@
+import asyncio
+import re
+from itertools import chain
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import aiofiles
 import vdf
 from aiohttp import ClientSession
 
-from .dl import get
+from .dl import Downloader, get_downloader
 from .log import log
+from .session import resolve_session
 from .stack_error import stack_error
 
 DEPOT_CACHE_PATH_NAME = 'depotcache'
 
+# Key.vdf的形状固定（depots -> depot_id -> DecryptionKey），直接在bytes上
+# 抽取比先解码再跑纯Python的vdf tokenizer快一个量级
+_KEY_RE = re.compile(rb'"(\d+)"\s*\{\s*"DecryptionKey"\s*"([0-9a-fA-F]+)"', re.DOTALL)
+
 
 async def get_manifest(
     sha: str,
     path: str,
     steam_path: Path,
     repo: str,
-    session: ClientSession
+    session: Optional[ClientSession] = None,
+    downloader: Optional[Downloader] = None
 ) -> List[Tuple[str, str]]:
     """获取Steam清单文件或密钥文件
 
@@ -26,12 +35,17 @@ async def get_manifest(
         path: 文件路径 (.manifest 或 Key.vdf)
         steam_path: Steam安装路径
         repo: 仓库地址
-        session: aiohttp会话
+        session: aiohttp会话，缺省时使用上下文绑定的共享会话
+        downloader: 下载器实例，缺省时使用进程内共享的缓存下载器
 
     Returns:
         对于.manifest文件: 返回空列表
         对于Key.vdf文件: 返回[(depot_id, decryption_key), ...]
     """
+    session = resolve_session(session)
+    if downloader is None:
+        downloader = get_downloader()
+
     collected_depots: List[Tuple[str, str]] = []
     depot_cache_path = steam_path / DEPOT_CACHE_PATH_NAME
 
@@ -47,16 +61,29 @@ async def get_manifest(
                 log.warning(f'⚠️ 已存在清单: {save_path}')
                 return collected_depots
 
-            content = await get(sha, path, repo, session)
+            # 缓存命中时blob直接复制到depotcache，不经过Python层缓冲
+            if await downloader.stream_to(f"{repo}@{sha}/{path}", save_path):
+                log.info(f'✅ 清单缓存命中: {path}')
+                return collected_depots
+
+            content = await downloader.get(sha, path, repo, session)
             log.info(f'✅ 清单下载成功: {path}')
 
             async with aiofiles.open(save_path, 'wb') as f:
                 await f.write(content)
 
         elif path == 'Key.vdf':
-            content = await get(sha, path, repo, session)
+            content = await downloader.get(sha, path, repo, session)
             log.info(f'✅ 密钥下载成功: {path}')
 
+            # 快路径：正则直接匹配bytes，跳过UTF-8解码和整棵VDF树的构建；
+            # 只有每个DecryptionKey都被匹配到时才可信，
+            # 否则（如depot块里DecryptionKey前还有别的字段）回退完整解析
+            matches = _KEY_RE.findall(content)
+            if matches and len(matches) == content.count(b'"DecryptionKey"'):
+                return [(depot_id.decode(), key.decode()) for depot_id, key in matches]
+
+            # 慢路径：形状不符合预期时回退到完整的VDF解析
             try:
                 decoded_content = content.decode('utf-8')
             except UnicodeDecodeError as e:
@@ -89,4 +116,40 @@ async def get_manifest(
         log.error(f'❌ 处理失败: {path} - {stack_error(e)}')
         raise
 
-    return collected_depots
\ No newline at end of file
+    return collected_depots
+
+
+async def get_manifests(
+    items: List[Tuple[str, str]],
+    steam_path: Path,
+    repo: str,
+    session: Optional[ClientSession] = None,
+    downloader: Optional[Downloader] = None,
+    concurrency: int = 8
+) -> List[Tuple[str, str]]:
+    """并发获取一批清单/密钥文件
+
+    Args:
+        items: (sha, path)列表
+        steam_path: Steam安装路径
+        repo: 仓库地址
+        session: aiohttp会话，缺省时使用上下文绑定的共享会话
+        downloader: 下载器实例，缺省时使用进程内共享的缓存下载器
+        concurrency: 同时进行的下载数上限
+
+    Returns:
+        各Key.vdf解析出的[(depot_id, decryption_key), ...]合并结果
+    """
+    session = resolve_session(session)
+    if downloader is None:
+        downloader = get_downloader()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _bounded(sha: str, path: str) -> List[Tuple[str, str]]:
+        async with semaphore:
+            return await get_manifest(sha, path, steam_path, repo, session, downloader)
+
+    # gather而非TaskGroup：README承诺支持Python 3.10，TaskGroup要3.11
+    results = await asyncio.gather(*(_bounded(sha, path) for sha, path in items))
+    return list(chain.from_iterable(results))
\ No newline at end of file
@@ -1,4 +1,3 @@
-import os
 import winreg
 from pathlib import Path
 from typing import Optional
@@ -11,19 +10,21 @@ from .stack_error import stack_error
 STEAM_REG_PATH = r'Software\Valve\Steam'
 CUSTOM_STEAM_PATH_KEY = "Custom_Steam_Path"
 
-@lru_cache(maxsize=1)
-def get_steam_path() -> Optional[Path]:
-    """获取经过验证的Steam安装路径，优先使用用户配置的自定义路径。
-    
+@lru_cache(maxsize=4)
+def _resolve_steam_path(custom_steam_path: str) -> Optional[Path]:
+    """解析并验证Steam安装路径，以自定义路径字符串为缓存键。
+
+    配置重载后自定义路径变化会自然落到新的缓存键上；
+    路径在一次会话内不变，exists()只stat一次。
+
+    参数:
+        custom_steam_path: 用户配置的自定义路径，空串表示走注册表
+
     返回:
         Optional[Path]: 有效的Steam路径，若获取失败或路径无效则返回None
-    
-    异常:
-        KeyboardInterrupt: 用户主动中断操作时抛出
     """
     try:
         # 优先检查用户配置的自定义路径
-        custom_steam_path = config.get(CUSTOM_STEAM_PATH_KEY, "").strip()
         if custom_steam_path:
             custom_path = Path(custom_steam_path)
             if custom_path.exists():
@@ -37,7 +38,7 @@ def get_steam_path() -> Optional[Path]:
         with winreg.OpenKey(winreg.HKEY_CURRENT_USER, STEAM_REG_PATH) as key:
             steam_path_value = winreg.QueryValueEx(key, 'SteamPath')[0]
             steam_path = Path(steam_path_value)
-            
+
             if steam_path.exists():
                 log.debug(f"使用注册表Steam路径: {steam_path}")
                 return steam_path
@@ -53,4 +54,23 @@ def get_steam_path() -> Optional[Path]:
         return None
     except Exception as e:
         log.error(f'❌ 获取Steam路径时发生未知错误: {stack_error(e)}')
-        return None
\ No newline at end of file
+        return None
+
+def get_steam_path() -> Optional[Path]:
+    """获取经过验证的Steam安装路径，优先使用用户配置的自定义路径。
+
+    每次调用读取当前配置，把自定义路径作为缓存键传入，
+    因此配置重载后不会返回陈旧的解析结果。
+
+    返回:
+        Optional[Path]: 有效的Steam路径，若获取失败或路径无效则返回None
+    """
+    custom_steam_path = config.get(CUSTOM_STEAM_PATH_KEY, "").strip()
+    return _resolve_steam_path(custom_steam_path)
+
+def invalidate_steam_path() -> None:
+    """清空路径解析缓存，配置重载后调用"""
+    _resolve_steam_path.cache_clear()
+
+# 兼容旧调用名
+get_cached_steam_path = get_steam_path
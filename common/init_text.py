@@ -20,7 +20,7 @@ PROJECT_INFO = {
     "telegram": "https://t.me/ikunshare_qun"
 }
 
-LOG_ENTRIES = [
+_TEMPLATES = [
     ('info', '👤 原作者: {author} 维护人: {maintainer}'),
     ('warning', '本项目采用{license}开源许可证，请勿用于商业用途'),
     ('info', '📦 版本: {version}'),
@@ -29,12 +29,14 @@ LOG_ENTRIES = [
     ('warning', '🚨 {warning}\n   交流群组:\n    {telegram}'),
 ]
 
+# PROJECT_INFO是静态的，格式化在导入期一次完成
+LOG_ENTRIES = [
+    (level, template.format(**PROJECT_INFO)) for level, template in _TEMPLATES
+]
+
 def init() -> None:
     log.info(BANNER)
-    
-    for level, template in LOG_ENTRIES:
-        message = template.format(**PROJECT_INFO)
-        if level == 'info':
-            log.info(message)
-        else:
-            log.warning(message)
\ No newline at end of file
+
+    info, warning = log.info, log.warning
+    for level, message in LOG_ENTRIES:
+        (info if level == 'info' else warning)(message)
\ No newline at end of file
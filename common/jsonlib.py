@@ -0,0 +1,30 @@
+"""统一的JSON后端
+
+按 orjson -> ujson -> 标准库 的顺序选择可用实现，调用方只依赖
+loads / dumps / JSONDecodeError 三个名字，换库不再需要改动各调用点。
+dumps统一返回UTF-8字节。
+"""
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def dumps(obj, *, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
+
+    loads = _json.loads
+    # ujson没有独立的JSONDecodeError，两个后备实现都以ValueError为基类
+    JSONDecodeError = ValueError
+
+    def dumps(obj, *, indent: bool = False) -> bytes:
+        return _json.dumps(
+            obj, indent=2 if indent else 0, ensure_ascii=False
+        ).encode('utf-8')
@@ -1,6 +1,8 @@
+import io
 import os
 import re
 import asyncio
+import logging
 from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
@@ -10,10 +12,13 @@ from common.config import config
 from common.dkey_merge import depotkey_merge
 from common.migration import migrate
 from common.unlock import stool_add, greenluma_add
-from common.get_manifest_info import get_manifest
-from common.check import check_github_api_rate_limit
+from common.dl import get_downloader
+from common.get_manifest_info import get_manifests
+from common.check import rate_limit_cache
+from common.jsonlib import loads
 from common.log import log
 from common.get_steam_path import get_cached_steam_path
+from common.session import resolve_session
 from common.stack_error import stack_error
 
 # 获取Steam路径
@@ -21,54 +26,157 @@ steam_path = get_cached_steam_path()
 if steam_path is None:
     raise RuntimeError("无法获取Steam路径")
 
-# 检查GreenLuma存在性
-is_green_luma: bool = any(
-    (steam_path / dll).exists()
-    for dll in ['GreenLuma_2024_x86.dll', 'GreenLuma_2024_x64.dll']
+def _probe_unlock_tools(path: Path) -> Tuple[bool, bool]:
+    """一次scandir同时探测GreenLuma与SteamTools，代替逐个stat
+
+    Returns:
+        (is_green_luma, is_steam_tools)
+    """
+    try:
+        with os.scandir(path) as it:
+            names = {entry.name for entry in it}
+    except OSError:
+        names = set()
+
+    green_luma = bool(names & {'GreenLuma_2024_x86.dll', 'GreenLuma_2024_x64.dll'})
+
+    steam_tools = False
+    if 'config' in names:
+        try:
+            with os.scandir(path / 'config') as it:
+                steam_tools = any(
+                    entry.name == 'stUI' and entry.is_dir() for entry in it
+                )
+        except OSError:
+            pass
+    return green_luma, steam_tools
+
+# 导入时探测一次，会话期间视为不变
+is_green_luma, is_steam_tools = _probe_unlock_tools(steam_path)
+
+def _pause() -> None:
+    """等待用户按键，不再为此spawn一个cmd.exe子进程"""
+    try:
+        import msvcrt
+        print('按任意键继续...', end='', flush=True)
+        msvcrt.getch()
+        print()
+    except ImportError:
+        # 非Windows环境退回标准输入
+        input('按回车键继续...')
+
+# GitHub API请求头在一次会话内不变，构建一次
+_github_token = config.get("Github_Personal_Token", "")
+github_headers: Optional[Dict[str, str]] = (
+    {'Authorization': f'Bearer {_github_token}'} if _github_token else None
 )
 
-# 检查SteamTools存在性
-is_steam_tools: bool = (steam_path / 'config' / 'stUI').is_dir()
+# 按URL缓存(ETag, JSON)，条件GET命中304时既省流量也不计入GitHub限额
+_etag_cache: Dict[str, Tuple[str, Any]] = {}
+
+# GitHub API并发上限，避免触发二级限流和gather级联取消
+_GITHUB_CONCURRENCY = 8
+_gh_sem: Optional[asyncio.Semaphore] = None
+
+# CN网络区域检测结果在进程内不变，只探测一次
+_cn_checked = False
+
+# 预编译：从用户输入中提取App ID数字段
+_DIGITS_RE = re.compile(r'\d+')
+
+# 剩余API额度低于该值时提醒用户配置Token
+_RATE_LIMIT_WARN_THRESHOLD = 10
+
+def _github_semaphore() -> asyncio.Semaphore:
+    """懒创建信号量以绑定到当前运行的事件循环"""
+    global _gh_sem
+    if _gh_sem is None:
+        _gh_sem = asyncio.Semaphore(_GITHUB_CONCURRENCY)
+    return _gh_sem
 
 async def fetch_branch_info(
     session: ClientSession,
     url: str,
     headers: Optional[Dict[str, str]]
 ) -> Optional[Dict[str, Any]]:
-    """获取GitHub分支信息"""
+    """获取GitHub分支信息，带ETag条件请求缓存"""
     try:
-        async with session.get(url, headers=headers, ssl=False) as response:
-            if response.status == 200:
-                return await response.json()
-            log.error(f"❌ 获取分支信息失败，状态码: {response.status}")
-            return None
+        cached = _etag_cache.get(url)
+        req_headers = dict(headers) if headers else {}
+        if cached:
+            req_headers['If-None-Match'] = cached[0]
+
+        async with _github_semaphore():
+            async with session.get(url, headers=req_headers or None, ssl=False) as response:
+                # 限额信息随每个响应头带回，省去专门的rate_limit探测请求
+                rate_limit_cache.note_observed(response.headers)
+                remaining = response.headers.get('X-RateLimit-Remaining')
+                if remaining is not None and int(remaining) <= _RATE_LIMIT_WARN_THRESHOLD:
+                    log.warning(
+                        '[GitHub API] 剩余请求次数仅剩 %s，'
+                        '建议生成GitHub Token并配置在config.json中',
+                        remaining
+                    )
+
+                if response.status == 304:
+                    return cached[1]
+                if response.status == 200:
+                    # 大tree响应按64KiB块流入BytesIO再一次性解析，
+                    # 避免aiohttp默认read()的List[bytes]+join开销
+                    buf = io.BytesIO()
+                    async for chunk in response.content.iter_chunked(65536):
+                        buf.write(chunk)
+                    body = loads(buf.getvalue())
+                    etag = response.headers.get('ETag')
+                    if etag:
+                        _etag_cache[url] = (etag, body)
+                    return body
+                log.error("❌ 获取分支信息失败，状态码: %s", response.status)
+                return None
     except ClientError as e:
-        log.error(f'🌐 网络请求异常: {stack_error(e)}')
+        # 完整栈回溯只在DEBUG级别才值得格式化
+        log.error('🌐 网络请求异常: %s',
+                  stack_error(e) if log.isEnabledFor(logging.DEBUG) else e)
         return None
     except Exception as e:
-        log.error(f'❌ 获取信息失败: {stack_error(e)}')
+        log.error('❌ 获取信息失败: %s',
+                  stack_error(e) if log.isEnabledFor(logging.DEBUG) else e)
         return None
 
 async def get_latest_repo_info(
     session: ClientSession,
     repos: List[str],
     app_id: str,
-    headers: Optional[Dict[str, str]]
-) -> Tuple[Optional[str], Optional[str]]:
-    """获取最新仓库信息"""
-    urls = [f'https://api.github.com/repos/{repo}/branches/{app_id}' for repo in repos]
+    headers: Optional[Dict[str, str]],
+    branch_prefixes: Optional[Tuple[str, ...]] = None
+) -> Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]]]:
+    """获取最新仓库信息，连同胜出仓库的分支JSON一并返回
+
+    branch_prefixes为预先拼好的分支API前缀（与repos一一对应），
+    缺省时按repos现算。
+    """
+    if branch_prefixes is None:
+        branch_prefixes = tuple(
+            f'https://api.github.com/repos/{repo}/branches/' for repo in repos
+        )
+    urls = [prefix + app_id for prefix in branch_prefixes]
     tasks = [fetch_branch_info(session, url, headers) for url in urls]
-    results = await asyncio.gather(*tasks)
-    
+    # 单个仓库抛异常不应拖垮其余仓库的并发查询
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
     latest_date = None
     selected_repo = None
+    best_json = None
     for repo, r_json in zip(repos, results):
+        if isinstance(r_json, BaseException):
+            continue
         if r_json and r_json.get('commit'):
             commit_date = r_json['commit']['commit']['author']['date']
             if not latest_date or commit_date > latest_date:
                 latest_date = commit_date
                 selected_repo = repo
-    return selected_repo, latest_date
+                best_json = r_json
+    return selected_repo, latest_date, best_json
 
 async def process_repository_items(
     session: ClientSession,
@@ -78,12 +186,14 @@ async def process_repository_items(
     selected_repo: str
 ) -> List[Tuple[str, str]]:
     """并发处理仓库条目"""
-    tasks = [
-        get_manifest(sha, item['path'], steam_path, selected_repo, session)
-        for item in r_json.get('tree', [])
-    ]
-    results = await asyncio.gather(*tasks)
-    return [item for sublist in results for item in sublist]
+    # 所有清单下载共用进程内共享的缓存下载器（同一个进度条渲染器，
+    # 磁盘/内存缓存跨查询存活），并发度由get_manifests内部的信号量限制
+    downloader = get_downloader()
+    items = [(sha, item['path']) for item in r_json.get('tree', [])]
+    try:
+        return await get_manifests(items, steam_path, selected_repo, session, downloader)
+    finally:
+        downloader.stop_progress()
 
 async def handle_steam_tools(
     session: ClientSession,
@@ -107,78 +217,86 @@ async def handle_green_luma(
     # 处理应用ID
     if app_id.isdecimal():
         if await greenluma_add([int(app_id)]):
-            log.info(f'✅ 已添加应用ID {app_id} 到GreenLuma')
+            log.info('✅ 已添加应用ID %s 到GreenLuma', app_id)
     
-    # 处理Depot密钥
-    depot_config = {
-        'depots': {
-            depot_id: {'DecryptionKey': depot_key}
-            for depot_id, depot_key in collected_depots
-        }
-    }
-    await depotkey_merge(steam_path / 'config' / 'config.vdf', depot_config)
-    
-    # 处理Depot ID
-    depot_ids = []
-    for depot_id in depot_config['depots']:
+    # 一趟遍历同时构建密钥表和数字Depot ID列表，不再对生成的键二次扫描
+    depots_map: Dict[str, Dict[str, str]] = {}
+    depot_ids: List[int] = []
+    for depot_id, depot_key in collected_depots:
+        depots_map[depot_id] = {'DecryptionKey': depot_key}
         if depot_id.isdecimal():
             depot_ids.append(int(depot_id))
         else:
-            log.warning(f'⚠️ 忽略非数字Depot ID: {depot_id}')
-    
+            log.warning('⚠️ 忽略非数字Depot ID: %s', depot_id)
+
+    # 处理Depot密钥
+    await depotkey_merge(steam_path / 'config' / 'config.vdf', {'depots': depots_map})
+
     if depot_ids and await greenluma_add(depot_ids):
         log.info('✅ 已添加Depot ID到GreenLuma')
 
-async def main(app_id: str, repos: List[str]) -> bool:
-    """主处理流程"""
+async def main(
+    app_id: str,
+    repos: List[str],
+    session: Optional[ClientSession] = None,
+    branch_prefixes: Optional[Tuple[str, ...]] = None
+) -> bool:
+    """主处理流程
+
+    session由调用方（main_loop）传入并跨查询复用，
+    缺省时退回上下文绑定的共享会话。
+    """
     # 清理并验证App ID
-    match = re.search(r'\d+', app_id.strip())
+    match = _DIGITS_RE.search(app_id.strip())
     if not match:
         log.error('❌ App ID无效')
         return False
     app_id = match.group()
 
-    async with ClientSession() as session:
-        # 配置API请求头
-        github_token = config.get("Github_Personal_Token", "")
-        headers = {'Authorization': f'Bearer {github_token}'} if github_token else None
+    session = resolve_session(session)
+    headers = github_headers
 
-        # 执行前置检查
+    # CN检测只在首个查询时做；限额信息由每个GitHub响应头顺带更新
+    global _cn_checked
+    if not _cn_checked:
         await checkcn(session)
-        await check_github_api_rate_limit(headers, session)
-
-        # 获取最新仓库信息
-        selected_repo, latest_date = await get_latest_repo_info(session, repos, app_id, headers)
-        if not selected_repo:
-            log.error('❌ 未找到有效的仓库信息')
-            return False
-
-        log.info(f'✅ 选择清单仓库: {selected_repo}')
-        branch_url = f'https://api.github.com/repos/{selected_repo}/branches/{app_id}'
-        branch_info = await fetch_branch_info(session, branch_url, headers)
-
-        if not branch_info or not branch_info.get('commit'):
-            return False
-
-        # 处理仓库条目
-        sha = branch_info['commit']['sha']
-        tree_url = branch_info['commit']['commit']['tree']['url']
-        tree_info = await fetch_branch_info(session, tree_url, headers)
-        if not tree_info or not tree_info.get('tree'):
-            return False
-
-        collected_depots = await process_repository_items(session, tree_info, sha, steam_path, selected_repo)
-        if not collected_depots:
-            log.error('❌ 未找到有效的Depot信息')
-            return False
-
-        # 执行解锁操作
-        if is_steam_tools:
-            await handle_steam_tools(session, collected_depots, app_id)
-        if is_green_luma:
-            await handle_green_luma(session, collected_depots, app_id, steam_path)
-
-        log.info(f'📅 清单最后更新时间: {latest_date}')
-        log.info(f'✅ 入库成功: {app_id}')
-        os.system('pause')
-        return True
\ No newline at end of file
+        _cn_checked = True
+
+    # 获取最新仓库信息（分支JSON在选仓库时已经拿到，不再重复请求）
+    selected_repo, latest_date, branch_info = await get_latest_repo_info(
+        session, repos, app_id, headers, branch_prefixes
+    )
+    if not selected_repo:
+        log.error('❌ 未找到有效的仓库信息')
+        return False
+
+    log.info('✅ 选择清单仓库: %s', selected_repo)
+
+    if not branch_info or not branch_info.get('commit'):
+        return False
+
+    # 处理仓库条目
+    sha = branch_info['commit']['sha']
+    tree_url = branch_info['commit']['commit']['tree']['url']
+    tree_info = await fetch_branch_info(session, tree_url, headers)
+    if not tree_info or not tree_info.get('tree'):
+        return False
+
+    collected_depots = await process_repository_items(session, tree_info, sha, steam_path, selected_repo)
+    # 多个Key.vdf可能给出重复的depot，去重后下游少做无谓的合并与写入；
+    # dict构造保持顺序且同一depot以最后出现的密钥为准
+    collected_depots = list({depot_id: key for depot_id, key in collected_depots}.items())
+    if not collected_depots:
+        log.error('❌ 未找到有效的Depot信息')
+        return False
+
+    # 执行解锁操作
+    if is_steam_tools:
+        await handle_steam_tools(session, collected_depots, app_id)
+    if is_green_luma:
+        await handle_green_luma(session, collected_depots, app_id, steam_path)
+
+    log.info('📅 清单最后更新时间: %s', latest_date)
+    log.info('✅ 入库成功: %s', app_id)
+    _pause()
+    return True
\ No newline at end of file
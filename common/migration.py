@@ -17,7 +17,8 @@ DIRECTORY = Path(steam_path) / "config" / "stplug-in"
 TEMP_PATH = Path('./temp')
 SETUP_URL = 'https://steamtools.net/res/SteamtoolsSetup.exe'
 SETUP_FILE = TEMP_PATH / 'SteamtoolsSetup.exe'
-CHUNK_SIZE = 8192
+CHUNK_SIZE = 262144  # 256KiB大块减少线程池往返次数
+PROGRESS_UPDATE_BYTES = 65536  # 进度条至少累积64KiB才刷新，rich重绘不便宜
 TIMEOUT = ClientTimeout(total=30)
 
 
@@ -39,12 +40,18 @@ async def download_setup_file(session: ClientSession) -> bool:
                 task = progress.add_task("📥 下载安装程序中...", total=total_size)
 
                 try:
+                    bytes_since_update = 0
                     async with aiofiles.open(temp_file, 'wb') as f:
                         async for chunk in response.content.iter_chunked(CHUNK_SIZE):
                             await f.write(chunk)
-                            progress.update(task, advance=len(chunk))
+                            bytes_since_update += len(chunk)
+                            if bytes_since_update >= PROGRESS_UPDATE_BYTES:
+                                progress.update(task, advance=bytes_since_update)
+                                bytes_since_update = 0
+                    if bytes_since_update:
+                        progress.update(task, advance=bytes_since_update)
                 except Exception as e:
-                    log.error(f'❌ 下载过程中断: {e}')
+                    log.error('❌ 下载过程中断: %s', e)
                     temp_file.unlink(missing_ok=True)
                     return False
 
@@ -54,11 +61,11 @@ async def download_setup_file(session: ClientSession) -> bool:
             return True
 
     except ClientError as e:
-        log.error(f'❌ 网络错误: {e}')
+        log.error('❌ 网络错误: %s', e)
     except asyncio.TimeoutError:
         log.error('⏳ 下载超时')
     except Exception as e:
-        log.error(f'❌ 未知错误: {e}')
+        log.error('❌ 未知错误: %s', e)
     
     return False
 
@@ -70,9 +77,9 @@ async def migrate_files():
             new_name = file.name[len("Onekey_unlock_"):]
             try:
                 file.rename(DIRECTORY / new_name)
-                log.info(f'✅ 重命名成功: {file.name} -> {new_name}')
+                log.info('✅ 重命名成功: %s -> %s', file.name, new_name)
             except Exception as e:
-                log.error(f'❌ 重命名失败 {file.name}: {e}')
+                log.error('❌ 重命名失败 %s: %s', file.name, e)
 
 
 async def install_steamtools(session: ClientSession):
@@ -94,25 +101,25 @@ async def install_steamtools(session: ClientSession):
         # 等待安装完成
         stdout, stderr = await process.communicate()
         if process.returncode != 0:
-            log.error(f'❌ 安装失败，错误码: {process.returncode}')
-            log.debug(f'标准输出: {stdout.decode().strip()}')
-            log.debug(f'标准错误: {stderr.decode().strip()}')
+            log.error('❌ 安装失败，错误码: %s', process.returncode)
+            log.debug('标准输出: %s', stdout.decode().strip())
+            log.debug('标准错误: %s', stderr.decode().strip())
             return
 
         log.info('✅ SteamTools 安装成功')
     except Exception as e:
-        log.error(f'❌ 安装过程中发生错误: {e}')
+        log.error('❌ 安装过程中发生错误: %s', e)
     finally:
         # 清理临时文件
         for f in TEMP_PATH.glob('*'):
             try:
                 f.unlink()
             except Exception as e:
-                log.error(f'❌ 清理临时文件失败 {f}: {e}')
+                log.error('❌ 清理临时文件失败 %s: %s', f, e)
         try:
             TEMP_PATH.rmdir()
         except Exception as e:
-            log.error(f'❌ 清理临时目录失败: {e}')
+            log.error('❌ 清理临时目录失败: %s', e)
 
 
 async def migrate(st_use: bool, session: ClientSession) -> None:
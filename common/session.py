@@ -0,0 +1,70 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import aiohttp
+
+from .jsonlib import dumps
+
+_session: Optional[aiohttp.ClientSession] = None
+
+# 当前上下文绑定的会话，调用链可以不显式传session参数
+current_session: ContextVar[aiohttp.ClientSession] = ContextVar('session')
+
+
+def get_session() -> aiohttp.ClientSession:
+    """获取全应用共享的ClientSession
+
+    复用同一个连接池可以省掉每次请求的TLS握手，DNS缓存覆盖
+    api.github.com与各CN镜像域名的解析开销。
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=32,
+                limit_per_host=8,
+                ttl_dns_cache=300,
+                use_dns_cache=True,
+                ssl=False,
+            ),
+            timeout=aiohttp.ClientTimeout(total=30),
+            json_serialize=lambda obj: dumps(obj).decode(),
+        )
+    return _session
+
+
+def resolve_session(session: Optional[aiohttp.ClientSession] = None) -> aiohttp.ClientSession:
+    """解析实际使用的会话
+
+    显式传入的优先，其次取上下文绑定的会话，最后退回全局共享会话。
+    """
+    if session is not None:
+        return session
+    try:
+        return current_session.get()
+    except LookupError:
+        return get_session()
+
+
+@asynccontextmanager
+async def bind_session(session: Optional[aiohttp.ClientSession] = None):
+    """把会话绑定到当前上下文，作用域内的调用可省略session参数
+
+    未传入时绑定全局共享会话；测试或基准可以绑定替身会话而
+    不必改动任何函数签名。
+    """
+    session = session if session is not None else get_session()
+    token = current_session.set(session)
+    try:
+        yield session
+    finally:
+        current_session.reset(token)
+
+
+async def close_session() -> None:
+    """关闭共享会话，程序退出前调用"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -1,21 +1,36 @@
 import os
 import asyncio
-import aiofiles
 from pathlib import Path
 from typing import List, Tuple
 import aiofiles.os as aios
 from .get_steam_path import get_cached_steam_path
 from .log import log
 
-lock = asyncio.Lock()
+# 初始化Steam路径
+_STEAM_PATH = get_cached_steam_path()
+if _STEAM_PATH is None:
+    raise RuntimeError("无法获取Steam路径")
+
+# 路径在会话期间不变，导入时拼好
+_STPLUGIN = _STEAM_PATH / 'config' / 'stplug-in'
+_LUAPACKA = _STPLUGIN / 'luapacka.exe'
+_APPLIST = _STEAM_PATH / 'AppList'
+
+# 按app_id各持一把锁：不同游戏的解锁写入互不排队，
+# 只有同一app_id的并发调用才需要串行
+_locks: dict = {}
+
+def _app_lock(app_id: str) -> asyncio.Lock:
+    """取得app_id对应的锁，首次访问时创建"""
+    return _locks.setdefault(app_id, asyncio.Lock())
 
 async def _write_lua_file(filepath: Path, app_id: str, depot_data: List[Tuple[str, str]]) -> None:
     """生成Lua解锁文件的辅助函数"""
     content = [f'addappid({app_id}, 1, "None")']
     content.extend(f'addappid({depot_id}, 1, "{depot_key}")' for depot_id, depot_key in depot_data)
-    
-    async with aiofiles.open(filepath, mode="w", encoding="utf-8") as f:
-        await f.write('\n'.join(content))
+
+    # 小文件一次write_text落盘，只占一趟线程池往返
+    await asyncio.to_thread(filepath.write_text, '\n'.join(content), 'utf-8')
 
 async def _run_luapacka(luapacka_path: Path, lua_filepath: Path) -> bool:
     """异步执行luapacka的辅助函数"""
@@ -30,31 +45,26 @@ async def _run_luapacka(luapacka_path: Path, lua_filepath: Path) -> bool:
         _, stderr = await proc.communicate()
         
         if proc.returncode != 0:
-            log.error(f'❌ 调用失败: {stderr.decode().strip()}')
+            log.error('❌ 调用失败: %s', stderr.decode().strip())
             return False
         return True
     except asyncio.CancelledError:
         raise
     except Exception as e:
-        log.error(f'❌ 执行luapacka时发生错误: {e}')
+        log.error('❌ 执行luapacka时发生错误: %s', e)
         return False
 
 async def stool_add(depot_data: List[Tuple[str, str]], app_id: str) -> bool:
     """生成并处理SteamTools解锁文件"""
-    steam_path = get_cached_steam_path()
-    if not steam_path:
-        return False
-
-    lua_filename = f"{app_id}.lua"
-    lua_filepath = steam_path / "config" / "stplug-in" / lua_filename
-    luapacka_path = steam_path / "config" / "stplug-in" / "luapacka.exe"
+    lua_filepath = _STPLUGIN / f"{app_id}.lua"
+    luapacka_path = _LUAPACKA
 
-    async with lock:
-        log.info(f'📄 SteamTools 解锁文件生成: {lua_filepath}')
+    async with _app_lock(app_id):
+        log.info('📄 SteamTools 解锁文件生成: %s', lua_filepath)
         try:
             # 生成Lua文件
             await _write_lua_file(lua_filepath, app_id, depot_data)
-            log.info(f'🔄 正在处理文件: {lua_filepath}')
+            log.info('🔄 正在处理文件: %s', lua_filepath)
 
             # 异步执行打包程序
             if not await _run_luapacka(luapacka_path, lua_filepath):
@@ -66,58 +76,64 @@ async def stool_add(depot_data: List[Tuple[str, str]], app_id: str) -> bool:
             log.info("🛑 用户中断操作")
             return False
         except Exception as e:
-            log.error(f'❌ 处理过程出现错误: {e}')
+            log.error('❌ 处理过程出现错误: %s', e)
             return False
         finally:
             # 清理临时文件
             if await aios.path.exists(lua_filepath):
                 await aios.remove(lua_filepath)
-                log.info(f'🗑️ 删除临时文件: {lua_filepath}')
+                log.info('🗑️ 删除临时文件: %s', lua_filepath)
+
+def _scan_applist(app_list_path: Path):
+    """单次扫描AppList，返回(最大已占用索引, 已登记的depot_id集合)"""
+    max_index = -1
+    existing_ids = set()
+    with os.scandir(app_list_path) as it:
+        entries = [
+            (int(entry.name[:-4]), entry.path)
+            for entry in it
+            if entry.is_file() and entry.name.endswith('.txt')
+            and entry.name[:-4].isdecimal()
+        ]
+    for index, path in entries:
+        max_index = max(max_index, index)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                existing_ids.add(int(f.read().strip()))
+        except (OSError, ValueError):
+            pass  # 坏文件不阻塞其余条目
+    return max_index, existing_ids
+
+def _write_applist_entries(pending: List[Tuple[Path, int]]) -> None:
+    """在同一个线程趟内写出所有新条目，避免每文件一次线程池往返"""
+    for path, depot_id in pending:
+        path.write_text(str(depot_id), encoding='utf-8')
 
 async def greenluma_add(depot_id_list: List[str]) -> bool:
     """处理GreenLuma配置文件"""
-    steam_path = get_cached_steam_path()
-    if not steam_path:
-        return False
+    app_list_path = _APPLIST
 
-    app_list_path = steam_path / 'AppList'
-    
     try:
         await aios.makedirs(app_list_path, exist_ok=True)
 
-        # 清理旧文件
-        async for file in aios.scandir(app_list_path):
-            if file.name.endswith('.txt'):
-                await aios.remove(file.path)
-
-        # 读取现有配置
-        depot_dict = {}
-        async for file in aios.scandir(app_list_path):
-            if file.is_file() and file.name.endswith('.txt'):
-                stem = Path(file.name).stem
-                if stem.isdecimal():
-                    async with aiofiles.open(file.path, 'r', encoding='utf-8') as f:
-                        depot_id = (await f.read()).strip()
-                        depot_dict[int(stem)] = int(depot_id)
-
-        # 生成新配置
+        # 旧实现先删光.txt再重新扫描读取，第二次扫描必然为空；
+        # 现在一趟扫描拿到已有配置，新depot顺序追加即可
+        max_index, existing_ids = await asyncio.to_thread(_scan_applist, app_list_path)
+
+        pending: List[Tuple[Path, int]] = []
         for depot_id in map(int, depot_id_list):
-            if depot_id not in depot_dict.values():
-                # 寻找可用索引
-                index = max(depot_dict.keys(), default=-1) + 1
-                while index in depot_dict:
-                    index += 1
-
-                # 异步写入新文件
-                file_path = app_list_path / f'{index}.txt'
-                async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-                    await f.write(str(depot_id))
-                depot_dict[index] = depot_id
+            if depot_id not in existing_ids:
+                max_index += 1
+                pending.append((app_list_path / f'{max_index}.txt', depot_id))
+                existing_ids.add(depot_id)
+
+        if pending:
+            await asyncio.to_thread(_write_applist_entries, pending)
 
         return True
     except asyncio.CancelledError:
         log.info("🛑 用户中断操作")
         return False
     except Exception as e:
-        log.error(f'❌ 处理时出错: {e}')
+        log.error('❌ 处理时出错: %s', e)
         return False
\ No newline at end of file
@@ -1,12 +1,13 @@
 import sys
 import os
 import asyncio
-import re
+import logging
 from typing import List
 
 from colorama import Fore, Back, Style
 from colorama import init as cinit
 from common.log import log
+from common.session import get_session, close_session
 from common.stack_error import stack_error
 from common.init_text import init
 from common.main_func import main
@@ -24,40 +25,51 @@ cinit()
 # GitHub仓库列表
 repos: List[str] = [
     'ikun0014/ManifestHub',
-    'Auiowu/ManifestAutoUpdate', 
+    'Auiowu/ManifestAutoUpdate',
     'tymolu233/ManifestAutoUpdate',
     'ltsj/ManifestAutoUpdate'
 ]
 
+# 分支API的URL前缀在仓库列表确定后即不变，启动时拼好，
+# 每次查询只剩一次 prefix + app_id 的拼接
+repo_branch_prefixes: tuple = tuple(
+    f'https://api.github.com/repos/{repo}/branches/' for repo in repos
+)
+
+# 提示串是静态的，构建一次
+_PROMPT = f"{Fore.CYAN}{Back.BLACK}{Style.BRIGHT}📝 请输入游戏AppID: {Style.RESET_ALL}"
+
 def prompt_app_id() -> str:
     """
     提示用户输入AppID并进行验证
-    
+
     Returns:
         有效的AppID字符串
     """
     while True:
-        app_id = input(f"{Fore.CYAN}{Back.BLACK}{
-                       Style.BRIGHT}📝 请输入游戏AppID: {Style.RESET_ALL}").strip()
-        if re.match(r'^\d+$', app_id):
+        app_id = input(_PROMPT).strip()
+        # 纯数字校验用str.isdecimal，比正则引擎trampoline更省
+        if app_id.isdecimal():
             return app_id
         print(f"{Fore.RED}❌ 无效的AppID, 请输入数字!{Style.RESET_ALL}")
 
-async def main_loop() -> None:
+async def main_loop(session) -> None:
     """
-    主循环，持续获取AppID并处理
+    主循环，持续获取AppID并处理，所有查询复用同一个HTTP会话
     """
     while True:
         try:
             app_id = prompt_app_id()
-            await main(app_id, repos)
+            await main(app_id, repos, session, repo_branch_prefixes)
         except KeyboardInterrupt:
             log.info("🛑 程序已退出")
             break
         except EOFError:
             break
         except Exception as e:
-            log.error(f"❌ 处理AppID时发生错误: {stack_error(e)}")
+            # 栈回溯只在DEBUG级别才格式化，%式参数由handler惰性处理
+            log.error("❌ 处理AppID时发生错误: %s",
+                      stack_error(e) if log.isEnabledFor(logging.DEBUG) else e)
             await asyncio.sleep(1)
 
 async def run() -> None:
@@ -66,12 +78,17 @@ async def run() -> None:
     """
     try:
         log.info('ℹ️ App ID可以在SteamDB或Steam商店链接页面查看')
-        await main_loop()
+        # 会话提升到循环外，跨查询复用连接池与TLS会话
+        await main_loop(get_session())
     except KeyboardInterrupt:
         log.info("🛑 程序已退出")
     except Exception as e:
-        log.error(f'❌ 发生错误: {stack_error(e)}, 将在5秒后退出')
+        log.error('❌ 发生错误: %s, 将在5秒后退出',
+                  stack_error(e) if log.isEnabledFor(logging.DEBUG) else e)
         await asyncio.sleep(5)
+    finally:
+        # 关闭共享的HTTP会话
+        await close_session()
 
 if __name__ == '__main__':
     try: